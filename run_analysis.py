@@ -7,10 +7,15 @@ This script runs the complete analysis pipeline:
 2. RFM analysis and customer segmentation
 3. K-Means clustering
 4. Cohort analysis
-5. Generate visualizations and reports
+5. Customer lifetime value
+6. Seasonal trends
+7. Generate visualizations and reports
 
 Usage:
     python run_analysis.py
+    python run_analysis.py --watch    # refresh outputs as files land in data/raw/
+    python run_analysis.py --partition-by Country    # per-market outputs in parallel
+    python run_analysis.py --sample 0.1    # fast approximate run on 10% of customers
 
 Requirements:
     - Excel file in data/raw/ folder
@@ -21,6 +26,7 @@ import pandas as pd
 import numpy as np
 import sys
 import os
+import argparse
 from pathlib import Path
 import matplotlib.pyplot as plt
 
@@ -32,6 +38,13 @@ from data_cleaning import DataLoader
 from rfm_analysis import RFMAnalyzer
 from clustering import CustomerClustering
 from cohort_analysis import CohortAnalysis
+from io_utils import atomic_output
+from watcher import RawDataWatcher, IncrementalPipeline
+from partitioned import PartitionedPipeline
+from sampling import CustomerSampler
+from clv import CLVCalculator
+from trends import SeasonalTrends
+from metrics import RunMetrics
 
 
 def print_section(title):
@@ -48,38 +61,41 @@ def ensure_directories():
         Path(dir_path).mkdir(parents=True, exist_ok=True)
 
 
-def load_and_clean_data(data_path):
-    """Load and clean the raw data."""
+def load_and_clean_data(data_path, table='online_retail'):
+    """Load and clean the raw data (file, Parquet dataset or database URL)."""
     print_section("STEP 1: DATA LOADING & CLEANING")
     
-    if not os.path.exists(data_path):
+    if '://' not in data_path and not os.path.exists(data_path):
         print(f"\n❌ ERROR: Data file not found at: {data_path}")
         print("\nPlease place your Excel file in the data/raw/ folder.")
         print("Expected filename: online_retail_II.xlsx")
         print("\nOr update the data_path variable in this script.")
         sys.exit(1)
     
-    loader = DataLoader(data_path)
+    loader = DataLoader(data_path, table=table)
     df = loader.load_data()
     df_clean = loader.clean_data()
     
     # Save cleaned data
     output_path = 'data/processed/online_retail_cleaned.csv'
     loader.save_clean_data(output_path)
+    loader.save_partitioned('data/processed/transactions')
     
     # Print summary statistics
+    metrics = RunMetrics(df_clean)
+    first_date, last_date = metrics.date_range
     print(f"\n📊 Dataset Summary:")
-    print(f"   • Date Range: {df_clean['InvoiceDate'].min()} to {df_clean['InvoiceDate'].max()}")
-    print(f"   • Total Transactions: {len(df_clean):,}")
-    print(f"   • Unique Customers: {df_clean['CustomerID'].nunique():,}")
-    print(f"   • Unique Invoices: {df_clean['InvoiceNo'].nunique():,}")
-    print(f"   • Total Revenue: ${df_clean['TotalAmount'].sum():,.2f}")
-    print(f"   • Average Order Value: ${df_clean.groupby('InvoiceNo')['TotalAmount'].sum().mean():,.2f}")
+    print(f"   • Date Range: {first_date} to {last_date}")
+    print(f"   • Total Transactions: {metrics.n_transactions:,}")
+    print(f"   • Unique Customers: {metrics.n_customers:,}")
+    print(f"   • Unique Invoices: {metrics.n_invoices:,}")
+    print(f"   • Total Revenue: ${metrics.total_revenue:,.2f}")
+    print(f"   • Average Order Value: ${metrics.avg_order_value:,.2f}")
     
-    return df_clean
+    return df_clean, metrics
 
 
-def run_rfm_analysis(df):
+def run_rfm_analysis(df, metrics=None):
     """Perform RFM analysis and customer segmentation."""
     print_section("STEP 2: RFM ANALYSIS & SEGMENTATION")
     
@@ -102,19 +118,21 @@ def run_rfm_analysis(df):
     rfm_final = analyzer.segment_customers(rfm_scored)
     
     # Get segment summary
-    summary = analyzer.get_segment_summary(rfm_final)
+    metrics = metrics or RunMetrics(df)
+    summary = metrics.add_segments(rfm_final)
     
     print(f"\n📈 RFM Segment Summary:")
     print(summary.to_string())
     
     # Save results
-    rfm_final.to_csv('data/processed/rfm_analysis.csv', index=False)
+    with atomic_output('data/processed/rfm_analysis.csv') as tmp_path:
+        rfm_final.to_csv(tmp_path, index=False)
     print(f"\n✅ Saved: data/processed/rfm_analysis.csv")
     
     return rfm_final, summary
 
 
-def run_clustering(rfm_df):
+def run_clustering(rfm_df, metrics=None, stability_resamples=0):
     """Perform K-Means clustering on customer data."""
     print_section("STEP 3: CUSTOMER CLUSTERING (K-MEANS)")
     
@@ -134,13 +152,26 @@ def run_clustering(rfm_df):
     clusterer.fit(n_clusters=4)
     
     # Get cluster summary
-    cluster_summary = clusterer.get_cluster_summary()
+    if metrics is not None:
+        cluster_summary = metrics.add_clusters(clusterer.rfm)
+    else:
+        cluster_summary = clusterer.get_cluster_summary()
     
     print(f"\n📊 Cluster Summary:")
     print(cluster_summary.to_string())
     
+    # Bootstrap stability of the k=4 solution
+    if stability_resamples:
+        print(f"\n🔁 Bootstrap stability ({stability_resamples} resamples)...")
+        stability = clusterer.stability_analysis(n_resamples=stability_resamples)
+        print(stability.to_string())
+        with atomic_output('data/processed/cluster_stability.csv') as tmp_path:
+            stability.to_csv(tmp_path)
+        print(f"\n✅ Saved: data/processed/cluster_stability.csv")
+    
     # Save results
-    clusterer.rfm.to_csv('data/processed/customer_clusters.csv', index=False)
+    with atomic_output('data/processed/customer_clusters.csv') as tmp_path:
+        clusterer.rfm.to_csv(tmp_path, index=False)
     print(f"\n✅ Saved: data/processed/customer_clusters.csv")
     
     return clusterer, cluster_summary, k_results
@@ -155,7 +186,8 @@ def run_cohort_analysis(df):
         cohort_matrix = cohort_analyzer.create_cohort_matrix()
         
         # Save results
-        cohort_matrix.to_csv('data/processed/cohort_analysis.csv')
+        with atomic_output('data/processed/cohort_analysis.csv') as tmp_path:
+            cohort_matrix.to_csv(tmp_path)
         print(f"\n✅ Saved: data/processed/cohort_analysis.csv")
         
         # Print first few cohorts
@@ -169,9 +201,62 @@ def run_cohort_analysis(df):
         return None
 
 
-def generate_visualizations(df, rfm_df, clusterer):
+def run_clv_analysis(df, probabilistic=False, horizon=52):
+    """Compute customer lifetime value (and optionally a BG/NBD + Gamma-Gamma forecast)."""
+    print_section("STEP 5: CUSTOMER LIFETIME VALUE")
+    
+    calculator = CLVCalculator(df, customer_col='CustomerID', date_col='InvoiceDate',
+                               amount_col='TotalAmount', invoice_col='InvoiceNo')
+    clv = calculator.calculate_clv()
+    
+    with atomic_output('data/processed/clv_analysis.csv') as tmp_path:
+        clv.to_csv(tmp_path, index=False)
+    print(f"\n✅ Saved: data/processed/clv_analysis.csv")
+    print(f"\n📊 Top 5 Customers by Estimated CLV:")
+    print(clv.head().to_string(index=False))
+    
+    prediction = None
+    if probabilistic:
+        print(f"\n🔮 Fitting BG/NBD + Gamma-Gamma models...")
+        calculator.fit_probabilistic()
+        prediction = calculator.predict_clv(horizon=horizon)
+        with atomic_output('data/processed/clv_prediction.csv') as tmp_path:
+            prediction.to_csv(tmp_path, index=False)
+        print(f"\n✅ Saved: data/processed/clv_prediction.csv")
+        print(f"   • Predicted {horizon}-week revenue: ${prediction['PredictedCLV'].sum():,.2f}")
+    
+    return clv, prediction
+
+
+def run_trend_analysis(df):
+    """Aggregate monthly and weekly trends with YoY growth."""
+    print_section("STEP 6: SEASONAL TRENDS")
+    
+    trends = SeasonalTrends().update(df)
+    monthly = trends.monthly()
+    weekly = trends.weekly()
+    
+    with atomic_output('data/processed/monthly_trends.csv') as tmp_path:
+        monthly.to_csv(tmp_path)
+    with atomic_output('data/processed/weekly_trends.csv') as tmp_path:
+        weekly.to_csv(tmp_path)
+    print(f"\n✅ Saved: data/processed/monthly_trends.csv")
+    print(f"✅ Saved: data/processed/weekly_trends.csv")
+    
+    print(f"\n📊 Monthly Trends (last 6 months):")
+    print(monthly.tail(6).to_string())
+    
+    return trends
+
+
+def generate_visualizations(df, rfm_df, clusterer, clv_df=None, trends=None, metrics=None):
     """Generate all analysis visualizations."""
-    print_section("STEP 5: GENERATING VISUALIZATIONS")
+    print_section("STEP 7: GENERATING VISUALIZATIONS")
+    
+    if metrics is None:
+        metrics = RunMetrics(df)
+    if metrics.segment_summary is None:
+        metrics.add_segments(rfm_df)
     
     import matplotlib.pyplot as plt
     import seaborn as sns
@@ -204,7 +289,7 @@ def generate_visualizations(df, rfm_df, clusterer):
     axes[1, 0].set_ylabel('Number of Customers')
     
     # Segments
-    segment_counts = rfm_df['Segment'].value_counts()
+    segment_counts = metrics.segment_counts
     axes[1, 1].bar(range(len(segment_counts)), segment_counts.values, 
                    edgecolor='black', alpha=0.7, color='plum')
     axes[1, 1].set_xticks(range(len(segment_counts)))
@@ -213,18 +298,21 @@ def generate_visualizations(df, rfm_df, clusterer):
     axes[1, 1].set_ylabel('Number of Customers')
     
     plt.tight_layout()
-    plt.savefig('dashboards/rfm_distributions.png', dpi=300, bbox_inches='tight')
+    with atomic_output('dashboards/rfm_distributions.png') as tmp_path:
+        plt.savefig(tmp_path, dpi=300, bbox_inches='tight')
     plt.close()
     print("   ✓ rfm_distributions.png")
     
     # 2. Cluster Visualization
     print("\n📊 Creating cluster visualization (PCA)...")
-    clusterer.visualize_clusters(save_path='dashboards/customer_clusters_pca.png')
+    with atomic_output('dashboards/customer_clusters_pca.png') as tmp_path:
+        clusterer.visualize_clusters(save_path=tmp_path)
+    plt.close()
     print("   ✓ customer_clusters_pca.png")
     
     # 3. Revenue by Segment
     print("\n📊 Creating segment revenue chart...")
-    segment_revenue = rfm_df.groupby('Segment')['Monetary'].sum().sort_values(ascending=False)
+    segment_revenue = metrics.segment_revenue
     
     plt.figure(figsize=(14, 7))
     bars = plt.bar(range(len(segment_revenue)), segment_revenue.values, 
@@ -240,14 +328,16 @@ def generate_visualizations(df, rfm_df, clusterer):
                 f'${value:,.0f}', ha='center', va='bottom', fontweight='bold')
     
     plt.tight_layout()
-    plt.savefig('dashboards/segment_revenue.png', dpi=300, bbox_inches='tight')
+    with atomic_output('dashboards/segment_revenue.png') as tmp_path:
+        plt.savefig(tmp_path, dpi=300, bbox_inches='tight')
     plt.close()
     print("   ✓ segment_revenue.png")
     
     # 4. Monthly Revenue Trend
     print("\n📊 Creating monthly revenue trend...")
-    df['YearMonth'] = df['InvoiceDate'].dt.to_period('M')
-    monthly_sales = df.groupby('YearMonth')['TotalAmount'].sum()
+    if trends is None:
+        trends = SeasonalTrends().update(df)
+    monthly_sales = trends.monthly()['Revenue']
     
     plt.figure(figsize=(16, 7))
     plt.plot(monthly_sales.index.astype(str), monthly_sales.values, 
@@ -258,44 +348,51 @@ def generate_visualizations(df, rfm_df, clusterer):
     plt.xticks(rotation=45, ha='right')
     plt.grid(True, alpha=0.3, linestyle='--')
     plt.tight_layout()
-    plt.savefig('dashboards/monthly_revenue_trend.png', dpi=300, bbox_inches='tight')
+    with atomic_output('dashboards/monthly_revenue_trend.png') as tmp_path:
+        plt.savefig(tmp_path, dpi=300, bbox_inches='tight')
     plt.close()
     print("   ✓ monthly_revenue_trend.png")
     
     # 5. Customer Lifetime Value Distribution
     print("\n📊 Creating CLV distribution...")
+    # Fall back to total spend when no CLV table was computed
+    clv_values = clv_df['EstimatedCLV'] if clv_df is not None else rfm_df['Monetary']
     plt.figure(figsize=(12, 6))
-    plt.hist(rfm_df['Monetary'], bins=100, edgecolor='black', alpha=0.7, color='orange')
-    plt.axvline(rfm_df['Monetary'].mean(), color='red', linestyle='--', 
-                linewidth=2, label=f"Mean: ${rfm_df['Monetary'].mean():,.2f}")
-    plt.axvline(rfm_df['Monetary'].median(), color='green', linestyle='--', 
-                linewidth=2, label=f"Median: ${rfm_df['Monetary'].median():,.2f}")
+    plt.hist(clv_values, bins=100, edgecolor='black', alpha=0.7, color='orange')
+    plt.axvline(clv_values.mean(), color='red', linestyle='--', 
+                linewidth=2, label=f"Mean: ${clv_values.mean():,.2f}")
+    plt.axvline(clv_values.median(), color='green', linestyle='--', 
+                linewidth=2, label=f"Median: ${clv_values.median():,.2f}")
     plt.title('Customer Lifetime Value Distribution', fontsize=14, fontweight='bold', pad=20)
     plt.xlabel('Total Customer Value ($)', fontsize=12)
     plt.ylabel('Number of Customers', fontsize=12)
     plt.legend()
     plt.tight_layout()
-    plt.savefig('dashboards/clv_distribution.png', dpi=300, bbox_inches='tight')
+    with atomic_output('dashboards/clv_distribution.png') as tmp_path:
+        plt.savefig(tmp_path, dpi=300, bbox_inches='tight')
     plt.close()
     print("   ✓ clv_distribution.png")
     
     print(f"\n✅ All visualizations saved to dashboards/")
 
 
-def generate_summary_report(df, rfm_summary, cluster_summary):
+def generate_summary_report(df, rfm_summary, cluster_summary, metrics=None):
     """Generate a summary report with key metrics."""
-    print_section("STEP 6: GENERATING SUMMARY REPORT")
+    print_section("STEP 8: GENERATING SUMMARY REPORT")
+    
+    metrics = metrics or RunMetrics(df)
+    first_date, last_date = metrics.date_range
     
     report = f"""
 # E-COMMERCE CUSTOMER BEHAVIOR ANALYSIS
 ## Summary Report
 
 ### Dataset Overview
-- **Analysis Period**: {df['InvoiceDate'].min().date()} to {df['InvoiceDate'].max().date()}
-- **Total Transactions**: {len(df):,}
-- **Unique Customers**: {df['CustomerID'].nunique():,}
-- **Total Revenue**: ${df['TotalAmount'].sum():,.2f}
-- **Average Order Value**: ${df.groupby('InvoiceNo')['TotalAmount'].sum().mean():,.2f}
+- **Analysis Period**: {first_date.date()} to {last_date.date()}
+- **Total Transactions**: {metrics.n_transactions:,}
+- **Unique Customers**: {metrics.n_customers:,}
+- **Total Revenue**: ${metrics.total_revenue:,.2f}
+- **Average Order Value**: ${metrics.avg_order_value:,.2f}
 
 ### RFM Segmentation Results
 
@@ -333,16 +430,171 @@ def generate_summary_report(df, rfm_summary, cluster_summary):
 """
     
     # Save report
-    with open('reports/ANALYSIS_SUMMARY.md', 'w') as f:
-        f.write(report)
+    with atomic_output('reports/ANALYSIS_SUMMARY.md') as tmp_path:
+        with open(tmp_path, 'w') as f:
+            f.write(report)
     
     print(f"\n✅ Saved: reports/ANALYSIS_SUMMARY.md")
     
     return report
 
 
+def run_partitioned_analysis(df, group_col, min_group_size=100, max_workers=None):
+    """Run RFM, clustering and cohort analysis per group of `group_col`."""
+    print_section(f"PARTITIONED ANALYSIS BY {group_col.upper()}")
+    
+    pipeline = PartitionedPipeline(df, group_col=group_col, min_group_size=min_group_size,
+                                   max_workers=max_workers, n_clusters=4)
+    summary = pipeline.run(output_dir='data/processed/partitions')
+    
+    print(f"\n📊 Partition Summary:")
+    print(summary.to_string(index=False))
+    print(f"\n✅ Saved: data/processed/partitions/")
+    
+    return summary
+
+
+def run_sample_analysis(data_path, fraction, random_state=42, n_boot=1000, table='online_retail'):
+    """Approximate the pipeline on a stratified sample of customers."""
+    print_section(f"SAMPLE MODE: {fraction:.0%} OF CUSTOMERS")
+    
+    loader = DataLoader(data_path, table=table)
+    loader.load_data()
+    df_clean = loader.clean_data()
+    
+    sampler = CustomerSampler(df_clean, fraction=fraction, strata_col='Country',
+                              random_state=random_state)
+    sample_df, weights = sampler.sample()
+    
+    analyzer = RFMAnalyzer(sample_df, customer_col='CustomerID', date_col='InvoiceDate',
+                           amount_col='TotalAmount', invoice_col='InvoiceNo')
+    rfm_sample = analyzer.segment_customers(analyzer.score_rfm(analyzer.calculate_rfm()))
+    segment_estimates = sampler.estimate(rfm_sample, weights, group_col='Segment', n_boot=n_boot)
+    print(f"\n📈 Estimated Segments (95% bootstrap CI, scaled to all customers):")
+    print(segment_estimates.to_string())
+    
+    clusterer = CustomerClustering(rfm_sample)
+    clusterer.prepare_features(log_transform=True)
+    k_results = clusterer.find_optimal_k(k_range=range(2, 8))
+    print(f"\n🔍 Cluster count sweep on sample:")
+    print(k_results.to_string(index=False))
+    clusterer.fit(n_clusters=4)
+    cluster_estimates = sampler.estimate(clusterer.rfm, weights, group_col='Cluster', n_boot=n_boot)
+    print(f"\n📊 Estimated Clusters (k=4):")
+    print(cluster_estimates.to_string())
+    
+    cohort_matrix = CohortAnalysis(sample_df).create_cohort_matrix()
+    print(f"\n📊 Sample Cohort Retention (first 5 cohorts):")
+    print(cohort_matrix.head().to_string())
+    
+    with atomic_output('data/processed/sample_segment_estimates.csv') as tmp_path:
+        segment_estimates.to_csv(tmp_path)
+    with atomic_output('data/processed/sample_cluster_estimates.csv') as tmp_path:
+        cluster_estimates.to_csv(tmp_path)
+    print(f"\n✅ Saved: data/processed/sample_segment_estimates.csv")
+    print(f"✅ Saved: data/processed/sample_cluster_estimates.csv")
+    
+    return segment_estimates, cluster_estimates, k_results
+
+
+def refresh_outputs(pipeline):
+    """Rewrite every output from the incremental state (watch mode)."""
+    df_clean = pipeline.transactions
+    with atomic_output('data/processed/online_retail_cleaned.csv') as tmp_path:
+        df_clean.to_csv(tmp_path, index=False)
+    
+    metrics = RunMetrics(df_clean)
+    rfm_final, rfm_summary = pipeline.segmented_rfm()
+    metrics.segment_summary = rfm_summary
+    with atomic_output('data/processed/rfm_analysis.csv') as tmp_path:
+        rfm_final.to_csv(tmp_path, index=False)
+    
+    clusterer = pipeline.cluster(rfm_final)
+    cluster_summary = metrics.add_clusters(clusterer.rfm)
+    with atomic_output('data/processed/customer_clusters.csv') as tmp_path:
+        clusterer.rfm.to_csv(tmp_path, index=False)
+    
+    cohort_matrix = pipeline.cohort_matrix()
+    with atomic_output('data/processed/cohort_analysis.csv') as tmp_path:
+        cohort_matrix.to_csv(tmp_path)
+    
+    clv = CLVCalculator(df_clean, customer_col='CustomerID', date_col='InvoiceDate',
+                        amount_col='TotalAmount', invoice_col='InvoiceNo').calculate_clv()
+    with atomic_output('data/processed/clv_analysis.csv') as tmp_path:
+        clv.to_csv(tmp_path, index=False)
+    
+    with atomic_output('data/processed/monthly_trends.csv') as tmp_path:
+        pipeline.trends.monthly().to_csv(tmp_path)
+    
+    print(f"\n📊 {len(df_clean):,} transactions, {len(rfm_final):,} customers")
+    generate_visualizations(df_clean, rfm_final, clusterer, clv_df=clv, trends=pipeline.trends,
+                            metrics=metrics)
+    generate_summary_report(df_clean, rfm_summary, cluster_summary, metrics=metrics)
+
+
+def run_watch_mode(raw_dir, poll_interval=5.0, debounce=30.0):
+    """Watch raw_dir and incrementally refresh all outputs when files land."""
+    print_section(f"WATCH MODE: {raw_dir}")
+    print(f"\n👀 Polling every {poll_interval:g}s, refreshing after {debounce:g}s of quiet")
+    print("   Press Ctrl+C to stop.")
+    
+    Path(raw_dir).mkdir(parents=True, exist_ok=True)
+    watcher = RawDataWatcher(raw_dir, poll_interval=poll_interval, debounce=debounce)
+    pipeline = IncrementalPipeline(n_clusters=4)
+    
+    try:
+        for changed in watcher.batches():
+            print_section(f"REFRESH: {len(changed)} changed file(s)")
+            try:
+                added = pipeline.ingest(changed)
+                if added == 0:
+                    print("\nNo new clean rows; outputs unchanged.")
+                    continue
+                refresh_outputs(pipeline)
+                print(f"\n✅ Refreshed outputs with {added:,} new rows")
+            except Exception as e:
+                print(f"\n⚠️  Refresh failed: {str(e)}")
+                print("Keeping previous outputs; will retry on the next change.")
+    except KeyboardInterrupt:
+        print("\n\n👋 Watch mode stopped.")
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="E-Commerce Customer Behavior Analysis Pipeline")
+    parser.add_argument('--data-path', default='data/raw/online_retail_II.xlsx',
+                        help="Raw Excel/CSV/Parquet file, Parquet directory or database URL "
+                             "(e.g. sqlite:///data/raw/retail.db) for a one-off run")
+    parser.add_argument('--table', default='online_retail',
+                        help="Transactions table when --data-path is a database URL")
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep running and refresh outputs when files in --raw-dir change")
+    parser.add_argument('--raw-dir', default='data/raw',
+                        help="Folder watched in --watch mode")
+    parser.add_argument('--poll-interval', type=float, default=5.0,
+                        help="Seconds between folder scans in --watch mode")
+    parser.add_argument('--debounce', type=float, default=30.0,
+                        help="Seconds of quiet before a batch of changes is processed")
+    parser.add_argument('--partition-by', metavar='COLUMN',
+                        help="Run RFM/clustering/cohort separately for each value of COLUMN")
+    parser.add_argument('--min-group-size', type=int, default=100,
+                        help="Groups with fewer customers are batched into shared tasks")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes for --partition-by (default: CPU count)")
+    parser.add_argument('--sample', type=float, metavar='FRACTION',
+                        help="Approximate run on a stratified sample of customers (e.g. 0.1)")
+    parser.add_argument('--seed', type=int, default=42,
+                        help="Random seed for --sample")
+    parser.add_argument('--stability', type=int, default=0, metavar='N',
+                        help="Bootstrap the k=4 clusters N times to measure their stability")
+    parser.add_argument('--probabilistic-clv', action='store_true',
+                        help="Also fit BG/NBD + Gamma-Gamma models and predict 52-week CLV")
+    return parser.parse_args()
+
+
 def main():
     """Run the complete analysis pipeline."""
+    args = parse_args()
     
     print("\n" + "=" * 70)
     print("  E-COMMERCE CUSTOMER BEHAVIOR ANALYSIS PIPELINE")
@@ -352,35 +604,63 @@ def main():
     # Ensure directories exist
     ensure_directories()
     
-    # Define data path (UPDATE THIS if your file has a different name or location)
-    data_path = 'data/raw/online_retail_II.xlsx'
+    if args.watch:
+        run_watch_mode(args.raw_dir, poll_interval=args.poll_interval, debounce=args.debounce)
+        return
+    
+    # Define data path (pass --data-path if your file has a different name or location)
+    data_path = args.data_path
     
     try:
+        if args.sample:
+            run_sample_analysis(data_path, args.sample, random_state=args.seed, table=args.table)
+            return
+        
         # Step 1: Load and clean data
-        df_clean = load_and_clean_data(data_path)
+        df_clean, metrics = load_and_clean_data(data_path, table=args.table)
+        
+        if args.partition_by:
+            run_partitioned_analysis(df_clean, args.partition_by,
+                                     min_group_size=args.min_group_size,
+                                     max_workers=args.workers)
+            return
         
         # Step 2: RFM Analysis
-        rfm_final, rfm_summary = run_rfm_analysis(df_clean)
+        rfm_final, rfm_summary = run_rfm_analysis(df_clean, metrics=metrics)
         
         # Step 3: Customer Clustering
-        clusterer, cluster_summary, k_results = run_clustering(rfm_final)
+        clusterer, cluster_summary, k_results = run_clustering(
+            rfm_final, metrics=metrics, stability_resamples=args.stability)
         
         # Step 4: Cohort Analysis
         cohort_matrix = run_cohort_analysis(df_clean)
         
-        # Step 5: Generate Visualizations
-        generate_visualizations(df_clean, rfm_final, clusterer)
+        # Step 5: Customer Lifetime Value
+        clv, clv_prediction = run_clv_analysis(df_clean, probabilistic=args.probabilistic_clv)
+        
+        # Step 6: Seasonal Trends
+        trends = run_trend_analysis(df_clean)
+        
+        # Step 7: Generate Visualizations
+        generate_visualizations(df_clean, rfm_final, clusterer, clv_df=clv, trends=trends,
+                                metrics=metrics)
         
-        # Step 6: Generate Summary Report
-        report = generate_summary_report(df_clean, rfm_summary, cluster_summary)
+        # Step 8: Generate Summary Report
+        report = generate_summary_report(df_clean, rfm_summary, cluster_summary, metrics=metrics)
         
         # Final Summary
         print_section("ANALYSIS COMPLETE!")
         print("\n📁 Generated Files:")
         print("   ✓ data/processed/online_retail_cleaned.csv")
+        print("   ✓ data/processed/transactions/ (monthly Parquet partitions)")
         print("   ✓ data/processed/rfm_analysis.csv")
         print("   ✓ data/processed/customer_clusters.csv")
         print("   ✓ data/processed/cohort_analysis.csv")
+        print("   ✓ data/processed/clv_analysis.csv")
+        if clv_prediction is not None:
+            print("   ✓ data/processed/clv_prediction.csv")
+        print("   ✓ data/processed/monthly_trends.csv")
+        print("   ✓ data/processed/weekly_trends.csv")
         print("   ✓ dashboards/rfm_distributions.png")
         print("   ✓ dashboards/customer_clusters_pca.png")
         print("   ✓ dashboards/segment_revenue.png")
@@ -0,0 +1,155 @@
+"""
+Opt-in on-disk result cache for the expensive analysis methods.
+
+Results are keyed on a fingerprint of the method's input data plus its
+arguments, so re-running a notebook cell with unchanged inputs returns
+instantly. The cache directory is size-bounded with least-recently-used
+eviction.
+
+Usage:
+    cache = ResultCache('.analysis_cache')
+    analyzer = RFMAnalyzer(df, cache=cache)
+    rfm = analyzer.calculate_rfm()    # computed once, then loaded from disk
+"""
+
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from io_utils import atomic_output
+
+
+def fingerprint(obj):
+    """Return a short hex digest identifying the content of `obj`.
+
+    DataFrames/Series are hashed with pandas' vectorized row hashing (values
+    and index) plus their column names and dtypes; arrays by their raw bytes.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        h.update(repr(obj.shape).encode())
+        if isinstance(obj, pd.DataFrame):
+            h.update(repr(list(obj.columns)).encode())
+            h.update(repr(list(obj.dtypes.astype(str))).encode())
+        else:
+            h.update(repr((obj.name, str(obj.dtype))).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(repr((obj.shape, str(obj.dtype))).encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            h.update(fingerprint(item).encode())
+    else:
+        h.update(repr(obj).encode())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Pickle results under a cache directory with size-based LRU eviction."""
+
+    def __init__(self, cache_dir='.analysis_cache', max_bytes=500 * 1024 ** 2):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def make_key(self, name, *parts):
+        """Build a cache key `<name>-<digest>` from a method name and its inputs."""
+        return f"{name}-{fingerprint(parts)}"
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.pkl"
+
+    def get(self, key):
+        """Return the cached value for `key`, or None on a miss.
+        
+        Entries that cannot be unpickled (truncated, or written by another
+        pandas version or class layout) are deleted and treated as misses.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            path.unlink(missing_ok=True)
+            return None
+        # Touch the entry so eviction sees it as recently used
+        os.utime(path)
+        return value
+
+    def set(self, key, value):
+        """Store `value` under `key` and evict old entries if over budget."""
+        with atomic_output(self._path(key)) as tmp_path:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.evict()
+
+    def evict(self):
+        """Delete least-recently-used entries until the cache fits in `max_bytes`."""
+        entries = [(p.stat().st_mtime, p.stat().st_size, p) for p in self.cache_dir.glob('*.pkl')]
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def invalidate(self, name=None):
+        """Delete cached entries for one method (e.g. 'RFMAnalyzer.calculate_rfm') or all."""
+        pattern = f"{name}-*.pkl" if name else '*.pkl'
+        removed = 0
+        for path in self.cache_dir.glob(pattern):
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+    def size(self):
+        """Total size of the cache directory in bytes."""
+        return sum(p.stat().st_size for p in self.cache_dir.glob('*.pkl'))
+
+
+def memoize(inputs, state=()):
+    """Cache a method's result when its instance has a `cache` attribute set.
+
+    `inputs(self)` returns the instance data the result depends on (e.g. the
+    input DataFrame and column names). Attributes listed in `state` are saved
+    with the result and restored on a hit, so side effects such as
+    `self.rfm = ...` still happen.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = getattr(self, 'cache', None)
+            if cache is None:
+                return method(self, *args, **kwargs)
+
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = [(k, v) for k, v in bound.arguments.items() if k != 'self']
+            key = cache.make_key(f"{type(self).__name__}.{method.__name__}",
+                                 inputs(self), arguments)
+
+            hit = cache.get(key)
+            if hit is not None:
+                result, saved_state = hit
+                for name, value in saved_state.items():
+                    setattr(self, name, value)
+                return result
+
+            result = method(self, *args, **kwargs)
+            cache.set(key, (result, {name: getattr(self, name) for name in state}))
+            return result
+
+        return wrapper
+
+    return decorator
@@ -2,28 +2,93 @@
 Customer clustering using K-Means and other unsupervised methods.
 """
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
+from scipy.optimize import linear_sum_assignment
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 from sklearn.decomposition import PCA
 from sklearn.metrics import silhouette_score
 import matplotlib.pyplot as plt
 
+from cache import memoize
+from metrics import summarize_groups
+
+
+# Feature matrix and reference clustering shared with stability workers
+_STABILITY_DATA = None
+
+
+def _init_stability_worker(features, reference_labels, reference_centers):
+    """Store the shared arrays once per worker process and pin BLAS/OpenMP to one thread."""
+    global _STABILITY_DATA
+    _STABILITY_DATA = (features, reference_labels, reference_centers)
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+def _stability_batch(seeds):
+    """Refit K-Means on one bootstrap resample per seed.
+    
+    Returns how often each customer kept its reference cluster and the
+    per-cluster Jaccard similarity of every resample.
+    """
+    features, reference_labels, reference_centers = _STABILITY_DATA
+    n_samples, n_clusters = len(features), len(reference_centers)
+    agreement = np.zeros(n_samples, dtype=np.int32)
+    jaccards = []
+    
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        sample = rng.integers(0, n_samples, n_samples)
+        model = KMeans(n_clusters=n_clusters, n_init=1, random_state=int(seed))
+        model.fit(features[sample])
+        
+        # Align bootstrap clusters to the reference by nearest-centroid matching
+        cost = ((reference_centers[:, None, :] - model.cluster_centers_[None, :, :]) ** 2).sum(axis=2)
+        ref_idx, boot_idx = linear_sum_assignment(cost)
+        mapping = np.empty(n_clusters, dtype=np.int64)
+        mapping[boot_idx] = ref_idx
+        labels = mapping[model.predict(features)]
+        agreement += labels == reference_labels
+        
+        # Clusterwise Jaccard on the customers drawn into this resample
+        in_bag = np.unique(sample)
+        ref_in, boot_in = reference_labels[in_bag], labels[in_bag]
+        row = []
+        for c in range(n_clusters):
+            a, b = ref_in == c, boot_in == c
+            union = np.count_nonzero(a | b)
+            row.append(np.count_nonzero(a & b) / union if union else np.nan)
+        jaccards.append(row)
+    
+    return agreement, jaccards
+
 
 class CustomerClustering:
     """Perform K-Means clustering on customer RFM data."""
     
-    def __init__(self, rfm_df):
+    def __init__(self, rfm_df, cache=None):
         self.rfm = rfm_df.copy()
         self.features = ['Recency', 'Frequency', 'Monetary']
         self.scaled_features = None
+        self.log_transform = True
         self.model = None
         self.labels = None
+        self.stability = None
+        self.assignment_confidence = None
+        self.cache = cache
         
     def prepare_features(self, log_transform=True):
         """Prepare features for clustering."""
         feature_df = self.rfm[self.features].copy()
+        self.log_transform = log_transform
         
         if log_transform:
             # Log transform for skewed data
@@ -34,6 +99,7 @@ class CustomerClustering:
         
         return self.scaled_features
     
+    @memoize(inputs=lambda self: self.scaled_features)
     def find_optimal_k(self, k_range=range(2, 11)):
         """Use elbow method and silhouette score to find optimal k."""
         inertias = []
@@ -53,32 +119,76 @@ class CustomerClustering:
         
         return results
     
-    def fit(self, n_clusters=4):
-        """Fit K-Means model."""
-        self.model = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+    def fit(self, n_clusters=4, init_centers=None):
+        """Fit K-Means model.
+        
+        `init_centers` (original RFM units, e.g. a previous fit's `centers`)
+        warm-starts a single K-Means run instead of 10 random restarts.
+        """
+        if init_centers is None:
+            self.model = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+        else:
+            init_df = pd.DataFrame(init_centers, columns=self.features)
+            if self.log_transform:
+                init_df = np.log1p(init_df)
+            init = self.scaler.transform(init_df)
+            self.model = KMeans(n_clusters=len(init), init=init, n_init=1)
         self.labels = self.model.fit_predict(self.scaled_features)
         self.rfm['Cluster'] = self.labels
         
         # Calculate cluster centers in original scale
         centers_scaled = self.model.cluster_centers_
-        self.centers = np.expm1(self.scaler.inverse_transform(centers_scaled))
+        self.centers = self.scaler.inverse_transform(centers_scaled)
+        if self.log_transform:
+            self.centers = np.expm1(self.centers)
         
         return self
     
+    def stability_analysis(self, n_resamples=100, max_workers=None, random_state=42):
+        """Bootstrap stability of the fitted clusters.
+        
+        Refits K-Means (same k) on `n_resamples` bootstrap resamples in a
+        process pool, aligns each run's clusters to the fitted model by
+        centroid matching, and reports per-cluster Jaccard stability (mean
+        and std over resamples) plus each customer's assignment confidence
+        (share of resamples that put it in its fitted cluster). The feature
+        matrix is handed to each worker once; tasks carry only seeds.
+        """
+        if self.model is None:
+            raise ValueError("Fit the model first!")
+        
+        n_clusters = self.model.n_clusters
+        seeds = np.random.default_rng(random_state).integers(0, 2**31 - 1, n_resamples)
+        max_workers = max_workers or os.cpu_count()
+        batches = [b for b in np.array_split(seeds, max_workers * 4) if len(b)]
+        init_args = (np.ascontiguousarray(self.scaled_features), np.asarray(self.labels),
+                     self.model.cluster_centers_)
+        
+        agreement = np.zeros(len(self.scaled_features), dtype=np.int64)
+        jaccards = []
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=_init_stability_worker,
+                                 initargs=init_args) as executor:
+            for batch_agreement, batch_jaccards in executor.map(_stability_batch, batches):
+                agreement += batch_agreement
+                jaccards.extend(batch_jaccards)
+        
+        jaccards = np.array(jaccards)
+        self.assignment_confidence = pd.Series(agreement / n_resamples, index=self.rfm.index,
+                                               name='Assignment_Confidence')
+        self.stability = pd.DataFrame({
+            'Count': np.bincount(self.labels, minlength=n_clusters),
+            'Jaccard_Mean': np.nanmean(jaccards, axis=0).round(3),
+            'Jaccard_Std': np.nanstd(jaccards, axis=0).round(3),
+            'Avg_Confidence': self.assignment_confidence.groupby(self.labels).mean()
+                                  .reindex(range(n_clusters)).round(3).values,
+        }, index=pd.Index(range(n_clusters), name='Cluster'))
+        
+        return self.stability
+    
     def get_cluster_summary(self):
         """Get summary statistics for each cluster."""
-        summary = self.rfm.groupby('Cluster').agg({
-            'CustomerID': 'count',
-            'Recency': 'mean',
-            'Frequency': 'mean',
-            'Monetary': ['mean', 'sum']
-        }).round(2)
-        
-        summary.columns = ['Count', 'Avg_Recency', 'Avg_Frequency', 'Avg_Monetary', 'Total_Revenue']
-        summary['Percentage'] = (summary['Count'] / len(self.rfm) * 100).round(1)
-        summary['Revenue_Share'] = (summary['Total_Revenue'] / summary['Total_Revenue'].sum() * 100).round(1)
-        
-        return summary
+        return summarize_groups(self.rfm, 'Cluster')
     
     def visualize_clusters(self, save_path=None):
         """Create PCA visualization of clusters."""
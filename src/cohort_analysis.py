@@ -4,14 +4,146 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from operator import attrgetter
 
+from cache import memoize
+
+
+# Number of set bits in every possible byte value
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+class CohortMembership:
+    """Packed per-(cohort, period) bitsets of active customers.
+    
+    Customers get dense indices ordered by cohort, so each cohort owns a
+    contiguous range and stores a (n_periods, ceil(n_customers / 8)) uint8
+    array where bit i of row p is set if the cohort's i-th customer bought in
+    period p (months since first purchase). Retention questions are answered
+    with bitwise AND/OR/NOT over these rows instead of rescanning transactions.
+    """
+    
+    def __init__(self, customer_ids, cohort_ranges, bits):
+        self.customer_ids = customer_ids
+        self.cohort_ranges = cohort_ranges
+        self.bits = bits
+    
+    @classmethod
+    def from_transactions(cls, df, customer_col='CustomerID', date_col='InvoiceDate'):
+        """Build bitsets from transactions with one pass over distinct (customer, month) pairs."""
+        months = df[date_col].dt.to_period('M')
+        month_ord = months.dt.year.to_numpy() * 12 + months.dt.month.to_numpy() - 1
+        pairs = pd.DataFrame({'CustomerID': df[customer_col].to_numpy(),
+                              'Month': month_ord}).drop_duplicates()
+        
+        first = pairs.groupby('CustomerID')['Month'].min().rename('CohortMonth').reset_index()
+        first = first.sort_values(['CohortMonth', 'CustomerID']).reset_index(drop=True)
+        dense = pd.Series(np.arange(len(first)), index=first['CustomerID'])
+        
+        rows = dense.loc[pairs['CustomerID']].to_numpy()
+        periods = pairs['Month'].to_numpy() - first['CohortMonth'].to_numpy()[rows]
+        last_month = int(pairs['Month'].max()) if len(pairs) else 0
+        n_periods = int(periods.max()) + 1 if len(periods) else 0
+        active = np.zeros((len(first), n_periods), dtype=bool)
+        active[rows, periods] = True
+        
+        cohort_ranges = {}
+        bits = {}
+        cohort_months = first['CohortMonth'].to_numpy()
+        boundaries = np.flatnonzero(np.diff(cohort_months)) + 1
+        starts = np.concatenate([[0], boundaries])
+        stops = np.concatenate([boundaries, [len(first)]])
+        for start, stop in zip(starts, stops):
+            month = int(cohort_months[start])
+            cohort = pd.Period(year=month // 12, month=month % 12 + 1, freq='M')
+            cohort_ranges[cohort] = (start, stop)
+            # Only periods up to the last month in the data are observable
+            observed = last_month - month + 1
+            bits[cohort] = np.packbits(active[start:stop, :observed].T, axis=1)
+        
+        return cls(first['CustomerID'].to_numpy(), cohort_ranges, bits)
+    
+    @property
+    def cohorts(self):
+        """Cohort months, oldest first."""
+        return list(self.cohort_ranges)
+    
+    def _cohort(self, cohort):
+        """Accept a Period or a 'YYYY-MM' string."""
+        return cohort if isinstance(cohort, pd.Period) else pd.Period(cohort, freq='M')
+    
+    def active(self, cohort, period):
+        """Packed bitset of the cohort's customers active in `period`."""
+        bits = self.bits[self._cohort(cohort)]
+        if period >= len(bits):
+            return np.zeros(bits.shape[1], dtype=np.uint8)
+        return bits[period]
+    
+    def mask(self, cohort, all_of=(), any_of=(), none_of=()):
+        """Packed bitset of cohort customers active in every period of `all_of`,
+        at least one period of `any_of` (if given) and no period of `none_of`."""
+        cohort = self._cohort(cohort)
+        # Period 0 contains every member of the cohort, so it is the universe
+        result = self.bits[cohort][0].copy()
+        for period in all_of:
+            result &= self.active(cohort, period)
+        if any_of:
+            union = np.zeros_like(result)
+            for period in any_of:
+                union |= self.active(cohort, period)
+            result &= union
+        for period in none_of:
+            result &= ~self.active(cohort, period)
+        return result
+    
+    def count(self, cohort, all_of=(), any_of=(), none_of=()):
+        """Number of customers matching `mask`."""
+        return int(_POPCOUNT[self.mask(cohort, all_of, any_of, none_of)].sum(dtype=np.int64))
+    
+    def customers(self, cohort, all_of=(), any_of=(), none_of=()):
+        """Customer IDs matching `mask`."""
+        cohort = self._cohort(cohort)
+        start, stop = self.cohort_ranges[cohort]
+        selected = np.unpackbits(self.mask(cohort, all_of, any_of, none_of), count=stop - start)
+        return self.customer_ids[start:stop][selected.astype(bool)]
+    
+    def retention_matrix(self, definition='classic'):
+        """Cohort x period retention rates from the bitsets.
+        
+        'classic' counts customers active in exactly that period and, like
+        `CohortAnalysis.create_cohort_matrix`, leaves empty cells as NaN;
+        'rolling' counts customers active in that period or any later one.
+        Periods past the end of the data are NaN in both.
+        """
+        if definition not in ('classic', 'rolling'):
+            raise ValueError("definition must be 'classic' or 'rolling'")
+        
+        n_periods = max((len(b) for b in self.bits.values()), default=0)
+        rates = {}
+        for cohort, bits in self.bits.items():
+            if definition == 'rolling':
+                bits = np.bitwise_or.accumulate(bits[::-1], axis=0)[::-1]
+            counts = _POPCOUNT[bits].sum(axis=1, dtype=np.int64)
+            row = np.full(n_periods, np.nan)
+            row[:len(counts)] = counts / counts[0]
+            if definition == 'classic':
+                row[:len(counts)][counts == 0] = np.nan
+            rates[cohort] = row
+        
+        matrix = pd.DataFrame.from_dict(rates, orient='index')
+        matrix.index.name = 'CohortGroup'
+        matrix.columns.name = 'PeriodNumber'
+        return matrix
+
 
 class CohortAnalysis:
     """Perform cohort analysis on customer data."""
     
-    def __init__(self, df):
+    def __init__(self, df, cache=None):
         self.df = df.copy()
         self.retention_data = None
+        self.membership = None
+        self.cache = cache
         
+    @memoize(inputs=lambda self: self.df, state=('retention_data',))
     def create_cohort_matrix(self):
         """Generate cohort retention matrix."""
         # First purchase date per customer
@@ -35,6 +167,11 @@ class CohortAnalysis:
         self.retention_data = retention
         return retention
     
+    def build_membership(self):
+        """Build packed cohort membership bitsets for ad-hoc retention queries."""
+        self.membership = CohortMembership.from_transactions(self.df)
+        return self.membership
+    
     def visualize_cohort(self, save_path='dashboards/cohort_retention.png'):
         """Plot cohort retention heatmap."""
         if self.retention_data is None:
@@ -2,26 +2,116 @@
 Data loading and cleaning utilities for e-commerce analysis.
 """
 
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
+from io_utils import atomic_output
+
+
+# Common raw column name variations -> standard names
+COLUMN_MAPPING = {
+    # Invoice variations
+    'Invoice': 'InvoiceNo',
+    'invoice': 'InvoiceNo',
+    'invoice_no': 'InvoiceNo',
+    'InvoiceNumber': 'InvoiceNo',
+    
+    # Customer ID variations
+    'Customer ID': 'CustomerID',
+    'customer id': 'CustomerID',
+    'customer_id': 'CustomerID',
+    'CustomerId': 'CustomerID',
+    
+    # Price variations
+    'Price': 'UnitPrice',
+    'price': 'UnitPrice',
+    'unit_price': 'UnitPrice',
+    'Unit Price': 'UnitPrice',
+    
+    # Stock code variations
+    'StockCode': 'StockCode',
+    'stock_code': 'StockCode',
+    'Stock Code': 'StockCode',
+    
+    # Quantity variations
+    'quantity': 'Quantity',
+    'qty': 'Quantity',
+    'Qty': 'Quantity',
+    
+    # Description variations
+    'description': 'Description',
+    'desc': 'Description',
+    'Desc': 'Description',
+    
+    # Date variations
+    'InvoiceDate': 'InvoiceDate',
+    'invoice_date': 'InvoiceDate',
+    'Invoice Date': 'InvoiceDate',
+    'Date': 'InvoiceDate',
+    
+    # Country variations
+    'country': 'Country',
+}
+
+# Columns of the online_retail table in sql/01_schema.sql
+SQL_COLUMNS = ['invoice_no', 'stock_code', 'description', 'quantity',
+               'invoice_date', 'unit_price', 'customer_id', 'country']
+
+# Outlier threshold applied by clean_data (and pushed down to SQL sources)
+MAX_LINE_AMOUNT = 10000
+
+# One pooled engine per database URL, shared by every loader in the process
+_ENGINES = {}
+
+
+def get_engine(url):
+    """Return the shared SQLAlchemy engine (connection pool) for `url`."""
+    if url not in _ENGINES:
+        from sqlalchemy import create_engine
+        _ENGINES[url] = create_engine(url, pool_pre_ping=True)
+    return _ENGINES[url]
+
+
+# Column types for the partitioned Parquet dataset
+PARTITION_DTYPES = {
+    'InvoiceNo': 'string',
+    'StockCode': 'string',
+    'Description': 'string',
+    'Quantity': 'int32',
+    'UnitPrice': 'float64',
+    'CustomerID': 'float64',
+    'Country': 'category',
+    'TotalAmount': 'float64',
+}
+
 
 class DataLoader:
     """Handle loading and cleaning of online retail data."""
     
-    def __init__(self, filepath):
-        self.filepath = filepath
+    def __init__(self, filepath, table='online_retail', chunksize=50000):
+        self.filepath = str(filepath)
+        self.table = table
+        self.chunksize = chunksize
         self.df = None
         
     def load_data(self):
-        """Load raw data from CSV or Excel."""
-        if self.filepath.endswith('.csv'):
+        """Load raw data from CSV, Excel, Parquet or a SQLAlchemy database URL."""
+        if '://' in self.filepath:
+            self.df = self.load_sql()
+        elif self.filepath.endswith('.csv'):
             self.df = pd.read_csv(self.filepath)
         elif self.filepath.endswith(('.xlsx', '.xls')):
             self.df = pd.read_excel(self.filepath)
+        elif self.filepath.endswith('.parquet') or Path(self.filepath).is_dir():
+            self.df = self.load_parquet()
         else:
-            raise ValueError("File must be .csv or .xlsx")
+            raise ValueError("Source must be .csv, .xlsx, .parquet, a Parquet directory "
+                             "or a database URL")
         
         print(f"Loaded {len(self.df)} rows")
         print(f"Columns: {list(self.df.columns)}")
@@ -31,55 +121,58 @@ class DataLoader:
         
         return self.df
     
+    def load_sql(self):
+        """Stream the `online_retail` table (sql/01_schema.sql) from a database.
+        
+        The clean_data filters are pushed into the WHERE clause, rows are
+        fetched in `chunksize` batches through a server-side cursor, and the
+        process-wide pooled engine for the URL is reused.
+        """
+        import sqlalchemy as sa
+        
+        engine = get_engine(self.filepath)
+        t = sa.table(self.table, *[sa.column(c) for c in SQL_COLUMNS])
+        query = sa.select(*t.c).where(
+            t.c.customer_id.isnot(None),
+            # Case-sensitive and NULL-preserving, like str.contains('C', na=False)
+            sa.or_(t.c.invoice_no.is_(None), sa.func.instr(t.c.invoice_no, 'C') == 0),
+            t.c.quantity > 0,
+            t.c.unit_price > 0,
+            t.c.quantity * t.c.unit_price < MAX_LINE_AMOUNT,
+        )
+        
+        with engine.connect() as conn:
+            conn = conn.execution_options(stream_results=True, max_row_buffer=self.chunksize)
+            chunks = list(pd.read_sql(query, conn, chunksize=self.chunksize,
+                                      parse_dates=['invoice_date']))
+        if not chunks:
+            return pd.DataFrame(columns=SQL_COLUMNS)
+        return pd.concat(chunks, ignore_index=True)
+    
+    def load_parquet(self):
+        """Read a Parquet file or directory, pushing the positive quantity/price
+        filters down to the reader."""
+        path = Path(self.filepath)
+        if path.is_dir() and (path / 'manifest.json').exists():
+            # Month-partitioned dataset written by save_partitioned
+            return load_partitioned(path)
+        
+        import pyarrow.dataset as ds
+        
+        dataset = ds.dataset(path, format='parquet')
+        raw_names = {COLUMN_MAPPING.get(name, name): name for name in dataset.schema.names}
+        condition = None
+        for column in ('Quantity', 'UnitPrice'):
+            if column in raw_names:
+                clause = ds.field(raw_names[column]) > 0
+                condition = clause if condition is None else condition & clause
+        return dataset.to_table(filter=condition).to_pandas()
+    
     def standardize_columns(self):
         """Standardize column names to consistent format."""
-        # Create mapping for common variations
-        column_mapping = {
-            # Invoice variations
-            'Invoice': 'InvoiceNo',
-            'invoice': 'InvoiceNo',
-            'invoice_no': 'InvoiceNo',
-            'InvoiceNumber': 'InvoiceNo',
-            
-            # Customer ID variations
-            'Customer ID': 'CustomerID',
-            'customer id': 'CustomerID',
-            'customer_id': 'CustomerID',
-            'CustomerId': 'CustomerID',
-            
-            # Price variations
-            'Price': 'UnitPrice',
-            'price': 'UnitPrice',
-            'unit_price': 'UnitPrice',
-            'Unit Price': 'UnitPrice',
-            
-            # Stock code variations
-            'StockCode': 'StockCode',
-            'stock_code': 'StockCode',
-            'Stock Code': 'StockCode',
-            
-            # Quantity variations
-            'quantity': 'Quantity',
-            'qty': 'Quantity',
-            'Qty': 'Quantity',
-            
-            # Description variations
-            'description': 'Description',
-            'desc': 'Description',
-            'Desc': 'Description',
-            
-            # Date variations
-            'InvoiceDate': 'InvoiceDate',
-            'invoice_date': 'InvoiceDate',
-            'Invoice Date': 'InvoiceDate',
-            'Date': 'InvoiceDate',
-            
-            # Country variations
-            'country': 'Country',
-        }
         
         # Rename columns if they exist
-        for old_name, new_name in column_mapping.items():
+        for old_name, new_name in COLUMN_MAPPING.items():
             if old_name in self.df.columns and old_name != new_name:
                 self.df.rename(columns={old_name: new_name}, inplace=True)
                 print(f"  Renamed: '{old_name}' → '{new_name}'")
@@ -120,10 +213,97 @@ class DataLoader:
     def save_clean_data(self, output_path):
         """Save cleaned data to CSV."""
         if self.df is not None:
-            self.df.to_csv(output_path, index=False)
+            with atomic_output(output_path) as tmp_path:
+                self.df.to_csv(tmp_path, index=False)
             print(f"Saved to {output_path}")
         else:
             raise ValueError("No data to save!")
+    
+    def save_partitioned(self, output_dir, compression='zstd', max_workers=None):
+        """Save cleaned data as a Parquet dataset partitioned by invoice month.
+        
+        Writes one `month=YYYY-MM/part.parquet` file per month (in parallel)
+        and a `manifest.json` with per-partition row counts and min/max
+        invoice dates, which `load_partitioned` uses to prune by date range.
+        """
+        if self.df is None:
+            raise ValueError("No data to save!")
+        
+        output_dir = Path(output_dir)
+        df = self.df.astype({col: dtype for col, dtype in PARTITION_DTYPES.items()
+                             if col in self.df.columns})
+        months = df['InvoiceDate'].dt.to_period('M')
+        
+        def write_partition(item):
+            month, part = item
+            rel_path = f"month={month}/part.parquet"
+            with atomic_output(output_dir / rel_path) as tmp_path:
+                part.to_parquet(tmp_path, index=False, compression=compression)
+            return {
+                'month': str(month),
+                'path': rel_path,
+                'rows': len(part),
+                'min_date': part['InvoiceDate'].min().isoformat(),
+                'max_date': part['InvoiceDate'].max().isoformat(),
+            }
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            partitions = list(executor.map(write_partition, df.groupby(months, sort=True)))
+        
+        manifest = {'rows': len(df), 'partitions': partitions}
+        with atomic_output(output_dir / 'manifest.json') as tmp_path:
+            with open(tmp_path, 'w') as f:
+                json.dump(manifest, f, indent=2)
+        print(f"Saved {len(partitions)} monthly partitions to {output_dir}")
+        return manifest
+
+
+def load_partitioned(dataset_dir, start=None, end=None, columns=None, max_workers=None):
+    """Load a dataset written by `DataLoader.save_partitioned`.
+    
+    Only partitions whose [min_date, max_date] overlaps [start, end] are
+    read; rows are then trimmed to the exact (inclusive) range. A date-only
+    `end` (no time part) includes that whole day.
+    """
+    dataset_dir = Path(dataset_dir)
+    with open(dataset_dir / 'manifest.json') as f:
+        manifest = json.load(f)
+    
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    if end is not None and end == end.normalize():
+        end = end + pd.Timedelta(days=1)
+        before_end = lambda dates: dates < end
+    else:
+        before_end = lambda dates: dates <= end
+    selected = [
+        p for p in manifest['partitions']
+        if (start is None or pd.Timestamp(p['max_date']) >= start)
+        and (end is None or before_end(pd.Timestamp(p['min_date'])))
+    ]
+    print(f"Reading {len(selected)} of {len(manifest['partitions'])} partitions")
+    
+    if columns is not None and 'InvoiceDate' not in columns:
+        read_columns = list(columns) + ['InvoiceDate']
+    else:
+        read_columns = columns
+    
+    def read_partition(partition):
+        return pd.read_parquet(dataset_dir / partition['path'], columns=read_columns)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        parts = list(executor.map(read_partition, selected))
+    if not parts:
+        return pd.DataFrame(columns=read_columns or list(PARTITION_DTYPES) + ['InvoiceDate'])
+    
+    df = pd.concat(parts, ignore_index=True)
+    if start is not None:
+        df = df[df['InvoiceDate'] >= start]
+    if end is not None:
+        df = df[before_end(df['InvoiceDate'])]
+    if columns is not None:
+        df = df[list(columns)]
+    return df.reset_index(drop=True)
 
 
 def load_and_clean(filepath, output_path=None):
@@ -0,0 +1,26 @@
+"""
+File output helpers shared by the pipeline stages.
+"""
+
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def atomic_output(path):
+    """Yield a temporary path next to `path` and move it into place on success.
+
+    Readers of `path` only ever see the previous complete file or the new
+    complete file, never a partially written one. The temporary name keeps the
+    original suffix so writers that infer the format (e.g. `plt.savefig`) work.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.stem}.{os.getpid()}.tmp{path.suffix}")
+    try:
+        yield str(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
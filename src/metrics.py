@@ -0,0 +1,88 @@
+"""
+Per-run metrics context shared across pipeline stages.
+
+`RunMetrics` computes each named aggregate of the cleaned transactions at
+most once (invoice totals, customer counts, date range, ...) and holds the
+segment and cluster summaries once they are produced, so the console output,
+charts and summary report reuse them instead of re-grouping the full table.
+"""
+
+from functools import cached_property
+
+import pandas as pd
+
+
+def summarize_groups(df, group_col):
+    """Count, mean R/F/M, revenue and shares per value of `group_col`."""
+    summary = df.groupby(group_col).agg({
+        'CustomerID': 'count',
+        'Recency': 'mean',
+        'Frequency': 'mean',
+        'Monetary': ['mean', 'sum']
+    }).round(2)
+
+    summary.columns = ['Count', 'Avg_Recency', 'Avg_Frequency', 'Avg_Monetary', 'Total_Revenue']
+    summary['Percentage'] = (summary['Count'] / len(df) * 100).round(1)
+    summary['Revenue_Share'] = (summary['Total_Revenue'] / summary['Total_Revenue'].sum() * 100).round(1)
+
+    return summary
+
+
+class RunMetrics:
+    """Lazily computed, shared aggregates for one pipeline run."""
+
+    def __init__(self, df):
+        self.df = df
+        self.segment_summary = None
+        self.cluster_summary = None
+
+    @cached_property
+    def invoice_totals(self):
+        """Total amount per invoice."""
+        return self.df.groupby('InvoiceNo')['TotalAmount'].sum()
+
+    @cached_property
+    def avg_order_value(self):
+        return self.invoice_totals.mean()
+
+    @cached_property
+    def n_invoices(self):
+        return len(self.invoice_totals)
+
+    @cached_property
+    def n_customers(self):
+        return self.df['CustomerID'].nunique()
+
+    @cached_property
+    def n_transactions(self):
+        return len(self.df)
+
+    @cached_property
+    def total_revenue(self):
+        return self.df['TotalAmount'].sum()
+
+    @cached_property
+    def date_range(self):
+        """(first, last) invoice timestamp."""
+        return self.df['InvoiceDate'].min(), self.df['InvoiceDate'].max()
+
+    def add_segments(self, rfm_df):
+        """Summarize RFM segments once and keep the result."""
+        self.segment_summary = summarize_groups(rfm_df, 'Segment').sort_values(
+            'Total_Revenue', ascending=False)
+        return self.segment_summary
+
+    def add_clusters(self, clustered_df):
+        """Summarize clusters once and keep the result."""
+        self.cluster_summary = summarize_groups(clustered_df, 'Cluster')
+        return self.cluster_summary
+
+    @property
+    def segment_revenue(self):
+        """Revenue per segment, largest first (from the segment summary)."""
+        return self.segment_summary['Total_Revenue']
+
+    @property
+    def segment_counts(self):
+        """Customers per segment, largest first (from the segment summary)."""
+        return self.segment_summary['Count'].sort_values(ascending=False)
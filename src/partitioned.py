@@ -0,0 +1,173 @@
+"""
+Partitioned pipeline: run RFM, clustering and cohort analysis per group.
+
+The cleaned transactions are handed to each worker process once (inherited
+without copying under the `fork` start method, pickled once per worker
+otherwise); tasks only carry the group keys to analyze. Groups with fewer
+customers than `min_group_size` are batched into shared tasks so that
+process overhead does not dominate for tiny markets.
+"""
+
+import io
+import os
+import re
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from rfm_analysis import RFMAnalyzer
+from clustering import CustomerClustering
+from cohort_analysis import CohortAnalysis
+from io_utils import atomic_output
+
+
+_WORKER_DF = None
+
+
+def _init_worker(df):
+    """Store the shared transaction frame in the worker process."""
+    global _WORKER_DF
+    _WORKER_DF = df
+
+
+def partition_dirname(group_col, value):
+    """Filesystem-safe folder name for one group, e.g. `Country=United_Kingdom`."""
+    safe_value = re.sub(r'[^A-Za-z0-9._-]+', '_', str(value)).strip('_') or 'unknown'
+    return f"{group_col}={safe_value}"
+
+
+def analyze_group(df, n_clusters=4):
+    """Run the RFM, clustering and cohort steps on one group's transactions."""
+    analyzer = RFMAnalyzer(df, customer_col='CustomerID', date_col='InvoiceDate',
+                           amount_col='TotalAmount', invoice_col='InvoiceNo')
+    rfm = analyzer.segment_customers(analyzer.score_rfm(analyzer.calculate_rfm()))
+    segment_summary = analyzer.get_segment_summary(rfm)
+
+    clusterer = CustomerClustering(rfm)
+    clusterer.prepare_features(log_transform=True)
+    clusterer.fit(n_clusters=n_clusters)
+    cluster_summary = clusterer.get_cluster_summary()
+
+    cohort_matrix = CohortAnalysis(df).create_cohort_matrix()
+
+    return {
+        'rfm': rfm,
+        'clusters': clusterer.rfm,
+        'segment_summary': segment_summary,
+        'cluster_summary': cluster_summary,
+        'cohort_matrix': cohort_matrix,
+    }
+
+
+def _run_batch(group_col, keys, output_dir, n_clusters):
+    """Worker task: analyze each group in `keys` and write its outputs."""
+    df = _WORKER_DF[_WORKER_DF[group_col].isin(keys)]
+    results = []
+    for key, group_df in df.groupby(group_col, sort=False):
+        row = {
+            group_col: key,
+            'Customers': group_df['CustomerID'].nunique(),
+            'Transactions': len(group_df),
+            'Revenue': round(group_df['TotalAmount'].sum(), 2),
+        }
+        try:
+            with redirect_stdout(io.StringIO()):
+                result = analyze_group(group_df, n_clusters=n_clusters)
+        except Exception as e:
+            row['Status'] = f"skipped: {e}"
+            results.append((row, None))
+            continue
+
+        group_dir = Path(output_dir) / partition_dirname(group_col, key)
+        group_dir.mkdir(parents=True, exist_ok=True)
+        with atomic_output(group_dir / 'rfm_analysis.csv') as tmp_path:
+            result['rfm'].to_csv(tmp_path, index=False)
+        with atomic_output(group_dir / 'customer_clusters.csv') as tmp_path:
+            result['clusters'].to_csv(tmp_path, index=False)
+        with atomic_output(group_dir / 'cohort_analysis.csv') as tmp_path:
+            result['cohort_matrix'].to_csv(tmp_path)
+
+        top_segment = result['segment_summary'].index[0]
+        row['Top_Segment'] = top_segment
+        row['Top_Segment_Revenue_Share'] = result['segment_summary'].loc[top_segment, 'Revenue_Share']
+        row['Status'] = 'ok'
+        results.append((row, result['segment_summary']))
+    return results
+
+
+class PartitionedPipeline:
+    """Fan the analysis pipeline out over the values of a grouping column."""
+
+    def __init__(self, df, group_col='Country', min_group_size=100,
+                 max_workers=None, n_clusters=4):
+        if group_col not in df.columns:
+            raise ValueError(f"Column '{group_col}' not found in data")
+        self.df = df
+        self.group_col = group_col
+        self.min_group_size = min_group_size
+        self.max_workers = max_workers or os.cpu_count()
+        self.n_clusters = n_clusters
+        self.summary = None
+        self.segment_summary = None
+
+    def plan_batches(self):
+        """Split groups into tasks: one per large group, small groups packed together.
+
+        Small groups are packed greedily until a batch holds at least
+        `min_group_size` customers in total.
+        """
+        sizes = (self.df.groupby(self.group_col)['CustomerID'].nunique()
+                 .sort_values(ascending=False))
+
+        batches = [[key] for key, size in sizes.items() if size >= self.min_group_size]
+        current, current_size = [], 0
+        for key, size in sizes[sizes < self.min_group_size].items():
+            current.append(key)
+            current_size += size
+            if current_size >= self.min_group_size:
+                batches.append(current)
+                current, current_size = [], 0
+        if current:
+            batches.append(current)
+        return batches
+
+    def run(self, output_dir='data/processed/partitions'):
+        """Analyze every group in parallel and write per-group and combined outputs."""
+        batches = self.plan_batches()
+        n_groups = sum(len(b) for b in batches)
+        print(f"Running {n_groups} '{self.group_col}' groups as {len(batches)} tasks "
+              f"on {self.max_workers} workers")
+
+        results = []
+        if self.max_workers == 1:
+            _init_worker(self.df)
+            for keys in batches:
+                results.extend(_run_batch(self.group_col, keys, output_dir, self.n_clusters))
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers,
+                                     initializer=_init_worker,
+                                     initargs=(self.df,)) as executor:
+                futures = [executor.submit(_run_batch, self.group_col, keys,
+                                           output_dir, self.n_clusters)
+                           for keys in batches]
+                for future in as_completed(futures):
+                    results.extend(future.result())
+
+        self.summary = (pd.DataFrame([row for row, _ in results])
+                        .sort_values('Revenue', ascending=False)
+                        .reset_index(drop=True))
+        segment_frames = {row[self.group_col]: seg for row, seg in results if seg is not None}
+        if segment_frames:
+            self.segment_summary = pd.concat(segment_frames, names=[self.group_col, 'Segment'])
+
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        with atomic_output(output_dir / 'partition_summary.csv') as tmp_path:
+            self.summary.to_csv(tmp_path, index=False)
+        if self.segment_summary is not None:
+            with atomic_output(output_dir / 'segment_summary.csv') as tmp_path:
+                self.segment_summary.to_csv(tmp_path)
+
+        return self.summary
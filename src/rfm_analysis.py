@@ -6,20 +6,27 @@ import pandas as pd
 import numpy as np
 from datetime import timedelta
 
+from cache import memoize
+from metrics import summarize_groups
+
 
 class RFMAnalyzer:
     """Calculate RFM scores and segments for customers."""
     
     def __init__(self, df, customer_col='Customer ID', 
                  date_col='InvoiceDate', amount_col='TotalAmount',
-                 invoice_col='Invoice'):
+                 invoice_col='Invoice', cache=None):
         self.df = df
         self.customer_col = customer_col
         self.date_col = date_col
         self.amount_col = amount_col
         self.invoice_col = invoice_col
         self.rfm = None
+        self.cache = cache
         
+    @memoize(inputs=lambda self: (self.df, self.customer_col, self.date_col,
+                                  self.amount_col, self.invoice_col),
+             state=('rfm',))
     def calculate_rfm(self, reference_date=None):
         """Calculate Recency, Frequency, Monetary metrics."""
         
@@ -95,17 +102,7 @@ class RFMAnalyzer:
     
     def get_segment_summary(self, rfm_df):
         """Generate summary statistics by segment."""
-        summary = rfm_df.groupby('Segment').agg({
-            'CustomerID': 'count',
-            'Recency': 'mean',
-            'Frequency': 'mean',
-            'Monetary': ['mean', 'sum']
-        }).round(2)
-        
-        summary.columns = ['Count', 'Avg_Recency', 'Avg_Frequency', 'Avg_Monetary', 'Total_Revenue']
-        summary['Percentage'] = (summary['Count'] / len(rfm_df) * 100).round(1)
-        summary['Revenue_Share'] = (summary['Total_Revenue'] / summary['Total_Revenue'].sum() * 100).round(1)
-        
+        summary = summarize_groups(rfm_df, 'Segment')
         return summary.sort_values('Total_Revenue', ascending=False)
 
 
@@ -0,0 +1,119 @@
+"""
+Stratified customer sampling for fast approximate analysis runs.
+
+Whole customers (all of their transactions) are sampled within strata of
+country x spend decile. Each sampled customer carries the weight N_h / n_h of
+its stratum, so weighted segment counts and revenue estimate the full
+population; bootstrap resampling within strata gives confidence intervals.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class CustomerSampler:
+    """Draw a stratified sample of customers and estimate population totals."""
+
+    def __init__(self, df, fraction=0.1, strata_col='Country', n_spend_bins=10,
+                 customer_col='CustomerID', amount_col='TotalAmount', random_state=42):
+        if not 0 < fraction <= 1:
+            raise ValueError("fraction must be in (0, 1]")
+        self.df = df
+        self.fraction = fraction
+        self.strata_col = strata_col
+        self.n_spend_bins = n_spend_bins
+        self.customer_col = customer_col
+        self.amount_col = amount_col
+        self.rng = np.random.default_rng(random_state)
+        self.customers = None
+
+    def build_strata(self):
+        """Assign every customer to a (country, spend decile) stratum."""
+        customers = self.df.groupby(self.customer_col).agg(
+            Stratum_Country=(self.strata_col, 'first'),
+            Spend=(self.amount_col, 'sum'),
+        )
+        n_bins = min(self.n_spend_bins, len(customers))
+        customers['Spend_Decile'] = pd.qcut(customers['Spend'].rank(method='first'),
+                                            n_bins, labels=False)
+        customers['Stratum'] = customers.groupby(['Stratum_Country', 'Spend_Decile']).ngroup()
+        self.customers = customers
+        return customers
+
+    def sample(self):
+        """Return the transactions of the sampled customers and their weights.
+
+        Every stratum keeps at least one customer. The weights Series is
+        indexed by customer and equals N_h / n_h of the customer's stratum.
+        """
+        if self.customers is None:
+            self.build_strata()
+
+        picked = []
+        weights = []
+        for _, members in self.customers.groupby('Stratum').groups.items():
+            n_total = len(members)
+            n_pick = max(1, int(round(self.fraction * n_total)))
+            chosen = self.rng.choice(np.asarray(members), size=n_pick, replace=False)
+            picked.append(chosen)
+            weights.append(np.full(n_pick, n_total / n_pick))
+
+        weights = pd.Series(np.concatenate(weights), index=np.concatenate(picked), name='Weight')
+        sample_df = self.df[self.df[self.customer_col].isin(weights.index)]
+        print(f"Sampled {len(weights):,} of {len(self.customers):,} customers "
+              f"({len(sample_df):,} transactions) from "
+              f"{self.customers['Stratum'].nunique()} strata")
+        return sample_df, weights
+
+    def estimate(self, rfm_df, weights, group_col='Segment', n_boot=1000, ci=0.95):
+        """Scaled-up counts and revenue shares per group with bootstrap CIs.
+
+        `rfm_df` holds one row per sampled customer with `group_col` and
+        `Monetary`. Customers are resampled with replacement within their
+        stratum; group labels are held fixed.
+        """
+        data = rfm_df[['CustomerID', group_col, 'Monetary']].copy()
+        data['Weight'] = data['CustomerID'].map(weights).to_numpy()
+        data['Stratum'] = data['CustomerID'].map(self.customers['Stratum']).to_numpy()
+        data = data.sort_values('Stratum').reset_index(drop=True)
+
+        groups, group_codes = np.unique(data[group_col].to_numpy(), return_inverse=True)
+        n_groups = len(groups)
+        weight = data['Weight'].to_numpy()
+        revenue = weight * data['Monetary'].to_numpy()
+
+        # Bootstrap indices drawn within each stratum, in chunks of replicates
+        # so memory stays bounded for large samples
+        _, starts, sizes = np.unique(data['Stratum'].to_numpy(),
+                                     return_index=True, return_counts=True)
+        stratum_pos = np.repeat(np.arange(len(sizes)), sizes)
+        boot_counts = np.empty((n_boot, n_groups))
+        boot_revenue = np.empty((n_boot, n_groups))
+        chunk = max(1, min(n_boot, 10_000_000 // max(len(data), 1)))
+        for first in range(0, n_boot, chunk):
+            n = min(chunk, n_boot - first)
+            offsets = (self.rng.random((n, len(data))) * sizes[stratum_pos]).astype(np.int64)
+            idx = starts[stratum_pos] + offsets
+            flat = (np.arange(n)[:, None] * n_groups + group_codes[idx]).ravel()
+            boot_counts[first:first + n] = np.bincount(
+                flat, weights=weight[idx].ravel(), minlength=n * n_groups).reshape(n, n_groups)
+            boot_revenue[first:first + n] = np.bincount(
+                flat, weights=revenue[idx].ravel(), minlength=n * n_groups).reshape(n, n_groups)
+        boot_share = boot_revenue / boot_revenue.sum(axis=1, keepdims=True) * 100
+
+        counts = np.bincount(group_codes, weights=weight, minlength=n_groups)
+        group_revenue = np.bincount(group_codes, weights=revenue, minlength=n_groups)
+        share = group_revenue / group_revenue.sum() * 100
+
+        lo, hi = (1 - ci) / 2 * 100, (1 + ci) / 2 * 100
+        result = pd.DataFrame({
+            'Est_Count': counts.round(0),
+            'Count_Low': np.percentile(boot_counts, lo, axis=0).round(0),
+            'Count_High': np.percentile(boot_counts, hi, axis=0).round(0),
+            'Est_Revenue': group_revenue.round(2),
+            'Revenue_Share': share.round(1),
+            'Share_Low': np.percentile(boot_share, lo, axis=0).round(1),
+            'Share_High': np.percentile(boot_share, hi, axis=0).round(1),
+        }, index=pd.Index(groups, name=group_col))
+
+        return result.sort_values('Est_Revenue', ascending=False)
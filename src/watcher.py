@@ -0,0 +1,304 @@
+"""
+Watch mode: incrementally refresh the analysis when new raw files land.
+
+`RawDataWatcher` polls the raw data folder and yields debounced batches of
+new, changed or removed files. `IncrementalPipeline` ingests only the rows it
+has not seen yet and keeps running per-customer aggregates and trend
+accumulators, so RFM, clusters, the cohort matrix and monthly trends are
+updated without re-reading or re-grouping the full history.
+"""
+
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from cache import fingerprint
+from data_cleaning import DataLoader
+from rfm_analysis import RFMAnalyzer
+from clustering import CustomerClustering
+from trends import SeasonalTrends
+
+
+RAW_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+
+
+class RawDataWatcher:
+    """Poll a folder for new, changed or removed raw transaction files."""
+
+    def __init__(self, raw_dir, poll_interval=5.0, debounce=30.0, max_wait=300.0):
+        self.raw_dir = Path(raw_dir)
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.signatures = {}
+
+    def scan(self):
+        """Return {path: (size, mtime)} for every raw file in the folder."""
+        signatures = {}
+        for path in sorted(self.raw_dir.iterdir()):
+            if path.suffix.lower() in RAW_EXTENSIONS and not path.name.startswith(('.', '~$')):
+                stat = path.stat()
+                signatures[str(path)] = (stat.st_size, stat.st_mtime_ns)
+        return signatures
+
+    def diff(self, current):
+        """Files that are new, changed or removed relative to the last processed scan."""
+        changed = [p for p, sig in current.items() if self.signatures.get(p) != sig]
+        removed = [p for p in self.signatures if p not in current]
+        return sorted(changed + removed)
+
+    def changed_files(self):
+        """Files whose signature differs from the last processed scan (including removals)."""
+        return self.diff(self.scan())
+
+    def wait_for_batch(self):
+        """Block until files changed, then until they stay quiet for `debounce` seconds.
+
+        A burst of drops is collected into one batch. `max_wait` caps how long
+        a continuous stream of changes can postpone the refresh.
+        """
+        while not self.changed_files():
+            time.sleep(self.poll_interval)
+
+        first_seen = time.monotonic()
+        last_state = self.scan()
+        quiet_since = time.monotonic()
+        while True:
+            now = time.monotonic()
+            if now - quiet_since >= self.debounce or now - first_seen >= self.max_wait:
+                break
+            time.sleep(min(self.poll_interval, self.debounce))
+            state = self.scan()
+            if state != last_state:
+                last_state = state
+                quiet_since = time.monotonic()
+
+        batch = self.diff(last_state)
+        self.signatures = last_state
+        return batch
+
+    def batches(self):
+        """Yield debounced batches of changed files forever."""
+        while True:
+            yield self.wait_for_batch()
+
+
+class IncrementalPipeline:
+    """Maintain cleaned transactions, RFM aggregates and cohort activity incrementally."""
+
+    def __init__(self, n_clusters=4):
+        self.n_clusters = n_clusters
+        self.offsets = {}
+        self.retry_paths = set()
+        self.needs_rebuild = False
+        self.transactions = None
+        self.customers = None
+        self.customer_invoices = None
+        self.activity = None
+        self.clusterer = None
+        self.trends = SeasonalTrends()
+
+    def reset(self):
+        """Forget all ingested data (used when a raw file is rewritten)."""
+        self.offsets = {}
+        self.retry_paths = set()
+        self.needs_rebuild = False
+        self.transactions = None
+        self.customers = None
+        self.customer_invoices = None
+        self.activity = None
+        self.clusterer = None
+        self.trends = SeasonalTrends()
+
+    @staticmethod
+    def _tail_bytes(path, size, n_bytes=4096):
+        """The last `n_bytes` of the first `size` bytes of `path`."""
+        with open(path, 'rb') as f:
+            f.seek(max(size - n_bytes, 0))
+            return f.read(min(size, n_bytes))
+
+    def read_new_rows(self, path):
+        """Read only the rows of `path` beyond what was ingested before.
+
+        Returns the new rows and the file's updated offset entry (not yet
+        recorded), or None if the file was rewritten rather than appended.
+        A CSV counts as rewritten if it shrank or the bytes just before the
+        previous end of file changed. Excel files are re-compressed on every
+        save, so for them the previously ingested rows are compared instead.
+        """
+        offset, size, check = self.offsets.get(path, (0, 0, None))
+        current_size = Path(path).stat().st_size
+
+        if path.endswith('.csv'):
+            if check is not None and (current_size < size or
+                                      self._tail_bytes(path, size) != check):
+                return None
+            new_rows = pd.read_csv(path, skiprows=range(1, offset + 1))
+            check = self._tail_bytes(path, current_size)
+        else:
+            rows = pd.read_excel(path)
+            # convert_dtypes so new rows (e.g. a blank Customer ID) don't change the old rows' digest
+            if check is not None and (len(rows) < offset or
+                                      fingerprint(rows.iloc[:offset].convert_dtypes()) != check):
+                return None
+            new_rows = rows.iloc[offset:]
+            check = fingerprint(rows.convert_dtypes())
+
+        return new_rows, (offset + len(new_rows), current_size, check)
+
+    def ingest(self, paths):
+        """Clean and fold the unseen rows of `paths` into the running state.
+
+        If a batch fails, its files are retried with the next batch (and a
+        full rebuild is scheduled if the running state may be half-updated),
+        so no rows are silently dropped. Returns the number of clean rows added.
+        """
+        paths = sorted(set(paths) | self.retry_paths)
+        try:
+            if self.needs_rebuild:
+                return self.rebuild(paths)
+            added = self._ingest(paths)
+        except Exception:
+            self.retry_paths |= set(paths)
+            raise
+        self.retry_paths = set()
+        return added
+
+    def _ingest(self, paths):
+        """Read and clean every file first; update offsets and aggregates only if all succeed."""
+        staged_offsets = {}
+        batches = []
+        for path in paths:
+            if not Path(path).exists():
+                if path not in self.offsets:
+                    continue
+                print(f"  {path} was removed; rebuilding from the remaining raw files")
+                return self.rebuild(paths)
+            result = self.read_new_rows(path)
+            if result is None:
+                print(f"  {path} was rewritten; rebuilding from all raw files")
+                return self.rebuild(paths)
+            new_rows, staged_offsets[path] = result
+            if len(new_rows) == 0:
+                continue
+            print(f"  {path}: {len(new_rows)} new rows")
+            loader = DataLoader(path)
+            loader.df = new_rows.reset_index(drop=True)
+            loader.standardize_columns()
+            batches.append(loader.clean_data())
+
+        if batches:
+            batch = pd.concat(batches, ignore_index=True)
+            try:
+                if self.transactions is None:
+                    self.transactions = batch
+                else:
+                    self.transactions = pd.concat([self.transactions, batch], ignore_index=True)
+                self._update_customers(batch)
+                self._update_activity(batch)
+                self.trends.update(batch)
+            except Exception:
+                # The aggregates may be partially updated; start over next time
+                self.needs_rebuild = True
+                raise
+        self.offsets.update(staged_offsets)
+        return len(batch) if batches else 0
+
+    def rebuild(self, paths=()):
+        """Re-ingest every known file plus `paths` from scratch, skipping removed files."""
+        known = sorted(p for p in set(self.offsets) | self.retry_paths | set(paths)
+                       if Path(p).exists())
+        self.reset()
+        # Until the rebuild succeeds, the next batch must start over from these files
+        self.retry_paths = set(known)
+        self.needs_rebuild = True
+        added = self._ingest(known)
+        self.retry_paths = set()
+        self.needs_rebuild = False
+        return added
+
+    def _update_customers(self, batch):
+        """Fold a clean batch into per-customer last date, spend, lines and invoice count."""
+        pairs = batch[['CustomerID', 'InvoiceNo']].drop_duplicates()
+        if self.customer_invoices is not None:
+            seen = pd.MultiIndex.from_frame(pairs).isin(self.customer_invoices)
+            pairs = pairs[~seen]
+            self.customer_invoices = self.customer_invoices.append(pd.MultiIndex.from_frame(pairs))
+        else:
+            self.customer_invoices = pd.MultiIndex.from_frame(pairs)
+
+        stats = batch.groupby('CustomerID').agg(
+            LastPurchase=('InvoiceDate', 'max'),
+            Monetary=('TotalAmount', 'sum'),
+            Lines=('TotalAmount', 'size'),
+        )
+        stats['Frequency'] = pairs.groupby('CustomerID').size()
+        stats['Frequency'] = stats['Frequency'].fillna(0).astype(int)
+
+        if self.customers is None:
+            self.customers = stats
+            return
+
+        combined = self.customers.reindex(self.customers.index.union(stats.index))
+        new = stats.reindex(combined.index)
+        combined['LastPurchase'] = pd.concat(
+            [combined['LastPurchase'], new['LastPurchase']], axis=1).max(axis=1)
+        for col in ['Monetary', 'Lines', 'Frequency']:
+            combined[col] = combined[col].fillna(0) + new[col].fillna(0)
+        combined['Lines'] = combined['Lines'].astype(int)
+        combined['Frequency'] = combined['Frequency'].astype(int)
+        self.customers = combined
+
+    def _update_activity(self, batch):
+        """Fold a clean batch into the distinct (customer, month) activity table."""
+        months = batch['InvoiceDate'].dt.to_period('M')
+        pairs = pd.DataFrame({'CustomerID': batch['CustomerID'], 'OrderPeriod': months})
+        pairs = pairs.drop_duplicates()
+        if self.activity is None:
+            self.activity = pairs.reset_index(drop=True)
+        else:
+            self.activity = pd.concat([self.activity, pairs], ignore_index=True).drop_duplicates()
+
+    def rfm(self):
+        """RFM table in the same shape as `RFMAnalyzer.calculate_rfm`."""
+        reference_date = self.customers['LastPurchase'].max() + pd.Timedelta(days=1)
+        rfm = pd.DataFrame({
+            'CustomerID': self.customers.index,
+            'Recency': (reference_date - self.customers['LastPurchase']).dt.days.values,
+            'Frequency': self.customers['Frequency'].values,
+            'Monetary': self.customers['Monetary'].values,
+            'AvgOrderValue': (self.customers['Monetary'] / self.customers['Lines']).values,
+        })
+        return rfm[(rfm['Monetary'] > 0) & (rfm['Frequency'] > 0)].reset_index(drop=True)
+
+    def segmented_rfm(self):
+        """Scored and segmented RFM table plus its segment summary."""
+        analyzer = RFMAnalyzer(self.transactions, customer_col='CustomerID',
+                               invoice_col='InvoiceNo')
+        analyzer.rfm = self.rfm()
+        rfm_final = analyzer.segment_customers(analyzer.score_rfm())
+        return rfm_final, analyzer.get_segment_summary(rfm_final)
+
+    def cluster(self, rfm_df):
+        """Refit clusters, warm-starting from the previous refresh's centers."""
+        init_centers = self.clusterer.centers if self.clusterer is not None else None
+        clusterer = CustomerClustering(rfm_df)
+        clusterer.prepare_features(log_transform=True)
+        clusterer.fit(n_clusters=self.n_clusters, init_centers=init_centers)
+        self.clusterer = clusterer
+        return clusterer
+
+    def cohort_matrix(self):
+        """Retention matrix in the same shape as `CohortAnalysis.create_cohort_matrix`."""
+        activity = self.activity
+        cohort = activity.groupby('CustomerID')['OrderPeriod'].transform('min')
+        period_number = ((activity['OrderPeriod'].dt.year - cohort.dt.year) * 12 +
+                         (activity['OrderPeriod'].dt.month - cohort.dt.month))
+        cohort_counts = (
+            pd.DataFrame({'CohortGroup': cohort, 'PeriodNumber': period_number})
+            .groupby(['CohortGroup', 'PeriodNumber']).size()
+            .unstack('PeriodNumber')
+        )
+        cohort_sizes = cohort_counts.iloc[:, 0]
+        return cohort_counts.divide(cohort_sizes, axis=0)